@@ -1,33 +1,68 @@
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field
+from fastapi.openapi.utils import get_openapi
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import BaseModel, ConfigDict, Field
 from decimal import Decimal
 from typing import Dict, List, Optional
 from datetime import datetime
-import uvicorn
+import msgspec
+import orjson
 
 from wallet_service import WalletService, Transaction, TransactionType
 
-app = FastAPI(title="FX Payment Processor", version="1.0.0")
+
+def _orjson_default(obj):
+    # Decimals are emitted as strings so amounts keep their exact precision
+    if isinstance(obj, Decimal):
+        return str(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class DecimalORJSONResponse(ORJSONResponse):
+    # FastAPI runs jsonable_encoder (Decimal -> float) on plain return values, so
+    # routes that want exact amounts must return this response explicitly
+    def render(self, content) -> bytes:
+        return orjson.dumps(
+            content,
+            default=_orjson_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        )
+
+
+app = FastAPI(
+    title="FX Payment Processor",
+    version="1.0.0",
+    default_response_class=DecimalORJSONResponse
+)
 
 wallet_service = WalletService()
 
+_REQUEST_CONFIG = ConfigDict(frozen=True)
+
+
 class FundRequest(BaseModel):
+    model_config = _REQUEST_CONFIG
+
     currency: str = Field(..., min_length=3, max_length=3)
     amount: Decimal = Field(..., gt=0)
 
 
 class ConvertRequest(BaseModel):
+    model_config = _REQUEST_CONFIG
+
     from_currency: str = Field(..., min_length=3, max_length=3)
     to_currency: str = Field(..., min_length=3, max_length=3)
     amount: Decimal = Field(..., gt=0)
 
 
 class WithdrawRequest(BaseModel):
+    model_config = _REQUEST_CONFIG
+
     currency: str = Field(..., min_length=3, max_length=3)
     amount: Decimal = Field(..., gt=0)
 
 
-class TransactionResponse(BaseModel):
+class TransactionResponse(msgspec.Struct):
     id: str
     user_id: str
     type: str
@@ -40,17 +75,28 @@ class TransactionResponse(BaseModel):
     exchange_rate: Optional[Decimal] = None
 
 
-class ReconciliationResponse(BaseModel):
+class ReconciliationResponse(msgspec.Struct):
     current_balances: Dict[str, Decimal]
     calculated_balances: Dict[str, Decimal]
     balanced: bool
 
 
+# msgspec encodes Decimal as a string and datetime as ISO 8601 natively
+_response_encoder = msgspec.json.Encoder()
+
+# FastAPI cannot derive OpenAPI schemas from Structs, so msgspec generates them
+(_transactions_schema, _reconciliation_schema), _response_schema_components = msgspec.json.schema_components(
+    [List[TransactionResponse], ReconciliationResponse],
+    ref_template="#/components/schemas/{name}"
+)
+
+
 @app.post("/wallets/{user_id}/fund")
 async def fund_wallet(user_id: str, request: FundRequest):
     try:
-        result = wallet_service.fund_wallet(user_id, request.currency, request.amount)
-        return result
+        async with wallet_service.lock:
+            result = wallet_service.fund_wallet(user_id, request.currency, request.amount)
+        return DecimalORJSONResponse(result)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -58,13 +104,14 @@ async def fund_wallet(user_id: str, request: FundRequest):
 @app.post("/wallets/{user_id}/convert")
 async def convert_currency(user_id: str, request: ConvertRequest):
     try:
-        result = wallet_service.convert_currency(
-            user_id, 
-            request.from_currency, 
-            request.to_currency, 
-            request.amount
-        )
-        return result
+        async with wallet_service.lock:
+            result = wallet_service.convert_currency(
+                user_id, 
+                request.from_currency, 
+                request.to_currency, 
+                request.amount
+            )
+        return DecimalORJSONResponse(result)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -72,23 +119,27 @@ async def convert_currency(user_id: str, request: ConvertRequest):
 @app.post("/wallets/{user_id}/withdraw")
 async def withdraw_funds(user_id: str, request: WithdrawRequest):
     try:
-        result = wallet_service.withdraw_funds(user_id, request.currency, request.amount)
-        return result
+        async with wallet_service.lock:
+            result = wallet_service.withdraw_funds(user_id, request.currency, request.amount)
+        return DecimalORJSONResponse(result)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/wallets/{user_id}/balances")
 async def get_balances(user_id: str) -> Dict[str, Decimal]:
-    return wallet_service.get_balances(user_id)
-
-@app.get("/wallets/{user_id}/transactions")
-async def get_transactions(user_id: str) -> List[TransactionResponse]:
-    transactions = wallet_service.get_transactions(user_id)
-    return [
+    return dict(wallet_service.get_balances(user_id))
+
+@app.get(
+    "/wallets/{user_id}/transactions",
+    responses={200: {"content": {"application/json": {"schema": _transactions_schema}}}}
+)
+async def get_transactions(user_id: str):
+    transactions = wallet_service.get_transactions_view(user_id)
+    items = [
         TransactionResponse(
             id=tx.id,
             user_id=tx.user_id,
-            type=tx.type.value,
+            type=tx.type.label,
             currency=tx.currency,
             amount=tx.amount,
             timestamp=tx.timestamp,
@@ -99,18 +150,30 @@ async def get_transactions(user_id: str) -> List[TransactionResponse]:
         )
         for tx in transactions
     ]
+    return Response(content=_response_encoder.encode(items), media_type="application/json")
 
-@app.get("/wallets/{user_id}/reconcile")
-async def reconcile_balances(user_id: str) -> ReconciliationResponse:
+@app.get(
+    "/wallets/{user_id}/reconcile",
+    responses={200: {"content": {"application/json": {"schema": _reconciliation_schema}}}}
+)
+async def reconcile_balances(user_id: str):
     result = wallet_service.reconcile_balances(user_id)
-    return ReconciliationResponse(**result)
+    return Response(
+        content=_response_encoder.encode(ReconciliationResponse(**result)),
+        media_type="application/json"
+    )
 
 @app.get("/fx-rates")
 async def get_fx_rates():
-    return {
-        f"{from_curr}_{to_curr}": rate 
-        for (from_curr, to_curr), rate in wallet_service.fx_rates.items()
-    }
+    body = wallet_service.fx_rates_cached_body
+    if body is None:
+        rates = {
+            f"{rate_key[:3]}_{rate_key[3:]}": rate 
+            for rate_key, rate in wallet_service.get_fx_rates().items()
+        }
+        body = orjson.dumps(rates, default=_orjson_default)
+        wallet_service.fx_rates_cached_body = body
+    return Response(content=body, media_type="application/json")
 
 @app.get("/")
 async def root():
@@ -123,13 +186,36 @@ async def update_fx_rates(rates: Dict[str, Decimal]):
         for key, rate in rates.items():
             if "_" in key:
                 from_curr, to_curr = key.split("_", 1)
-                new_rates[(from_curr, to_curr)] = rate
+                # Rates are keyed by the two 3-letter codes concatenated
+                if len(from_curr) == 3 and len(to_curr) == 3:
+                    new_rates[from_curr + to_curr] = rate
         
-        wallet_service.update_fx_rates(new_rates)
+        async with wallet_service.lock:
+            wallet_service.update_fx_rates(new_rates)
         return {"success": True, "updated_rates": len(new_rates)}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+def _openapi():
+    if app.openapi_schema:
+        return app.openapi_schema
+    schema = get_openapi(
+        title=app.title,
+        version=app.version,
+        openapi_version=app.openapi_version,
+        description=app.description,
+        routes=app.routes
+    )
+    schema.setdefault("components", {}).setdefault("schemas", {}).update(_response_schema_components)
+    app.openapi_schema = schema
+    return app.openapi_schema
+
+
+app.openapi = _openapi
+
+
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
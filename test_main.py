@@ -15,4 +15,54 @@ class TestAPI:
     def test_root_endpoint(self):
         response = client.get("/")
         assert response.status_code == 200
-        assert response.json() == {"message": "FX Payment Processor is running"}
\ No newline at end of file
+        assert response.json() == {"message": "FX Payment Processor is running"}
+
+    def test_money_responses_serialize_decimals_as_strings(self):
+        response = client.post("/wallets/user123/fund", json={"currency": "USD", "amount": "100.50"})
+        assert response.status_code == 200
+        assert response.json() == {"success": True, "new_balance": "100.50"}
+
+        response = client.post(
+            "/wallets/user123/convert",
+            json={"from_currency": "USD", "to_currency": "MXN", "amount": "10"}
+        )
+        assert response.json()["converted_amount"] == "187.00"
+        assert response.json()["exchange_rate"] == "18.70"
+
+        response = client.post("/wallets/user123/withdraw", json={"currency": "USD", "amount": "0.50"})
+        assert response.json() == {"success": True, "new_balance": "90.00"}
+
+        transactions = client.get("/wallets/user123/transactions").json()
+        assert [tx["amount"] for tx in transactions] == ["100.50", "10.00", "0.50"]
+
+    def test_fx_rates_reflect_updates(self):
+        original_rates = wallet_service.get_fx_rates()
+        try:
+            assert client.get("/fx-rates").json()["USD_MXN"] == "18.70"
+
+            response = client.post("/fx-rates", json={"USD_MXN": "19.25"})
+            assert response.json() == {"success": True, "updated_rates": 1}
+            assert client.get("/fx-rates").json()["USD_MXN"] == "19.25"
+
+            response = client.post("/fx-rates", json={"USD_MXN": "19.123456789"})
+            assert response.status_code == 400
+            assert client.get("/fx-rates").json()["USD_MXN"] == "19.25"
+        finally:
+            wallet_service.update_fx_rates(original_rates)
+
+    def test_openapi_documents_struct_responses(self):
+        schema = client.get("/openapi.json").json()
+        paths = schema["paths"]
+
+        transactions = paths["/wallets/{user_id}/transactions"]["get"]["responses"]["200"]
+        assert transactions["content"]["application/json"]["schema"] == {
+            "type": "array",
+            "items": {"$ref": "#/components/schemas/TransactionResponse"}
+        }
+        reconcile = paths["/wallets/{user_id}/reconcile"]["get"]["responses"]["200"]
+        assert reconcile["content"]["application/json"]["schema"] == {
+            "$ref": "#/components/schemas/ReconciliationResponse"
+        }
+        assert "amount" in schema["components"]["schemas"]["TransactionResponse"]["properties"]
+        assert "balanced" in schema["components"]["schemas"]["ReconciliationResponse"]["properties"]
+        assert "FundRequest" in schema["components"]["schemas"]
@@ -1,4 +1,6 @@
+import dataclasses
 import pytest
+from datetime import datetime
 from decimal import Decimal
 from wallet_service import WalletService, TransactionType
 
@@ -19,4 +21,154 @@ class TestWalletService:
         assert result["new_balance"] == Decimal("1000")
         
         balances = self.wallet_service.get_balances(user_id)
-        assert balances[currency] == Decimal("1000")
\ No newline at end of file
+        assert balances[currency] == Decimal("1000")
+
+    def test_reconcile_balances_after_conversion(self):
+        user_id = "user123"
+        self.wallet_service.fund_wallet(user_id, "USD", Decimal("1000"))
+        self.wallet_service.convert_currency(user_id, "USD", "MXN", Decimal("100.55"))
+        self.wallet_service.withdraw_funds(user_id, "MXN", Decimal("50"))
+        self.wallet_service.withdraw_funds(user_id, "USD", Decimal("899.45"))
+
+        result = self.wallet_service.reconcile_balances(user_id)
+
+        assert result["balanced"] is True
+        assert result["calculated_balances"] == {"MXN": Decimal("1830.29")}
+
+    def test_get_balances_snapshot_tracks_updates(self):
+        user_id = "user123"
+        self.wallet_service.fund_wallet(user_id, "USD", Decimal("100"))
+        first = self.wallet_service.get_balances(user_id)
+        assert self.wallet_service.get_balances(user_id) is first
+
+        self.wallet_service.withdraw_funds(user_id, "USD", Decimal("40"))
+        second = self.wallet_service.get_balances(user_id)
+        assert first["USD"] == Decimal("100")
+        assert second["USD"] == Decimal("60")
+        with pytest.raises(TypeError):
+            second["USD"] = Decimal("0")
+
+    def test_reconcile_balances_folds_new_transactions(self):
+        user_id = "user123"
+        self.wallet_service.fund_wallet(user_id, "USD", Decimal("100"))
+        assert self.wallet_service.reconcile_balances(user_id)["calculated_balances"] == {"USD": Decimal("100")}
+
+        self.wallet_service.fund_wallet(user_id, "MXN", Decimal("20.50"))
+        self.wallet_service.withdraw_funds(user_id, "USD", Decimal("100"))
+        result = self.wallet_service.reconcile_balances(user_id)
+
+        assert result["balanced"] is True
+        assert result["calculated_balances"] == {"MXN": Decimal("20.50")}
+
+    def test_transaction_timestamp_keeps_exact_microseconds(self):
+        self.wallet_service.fund_wallet("user123", "USD", Decimal("10"))
+        transaction = self.wallet_service.get_transactions("user123")[0]
+        transaction = dataclasses.replace(transaction, timestamp_ns=1_700_000_000_123_456_999)
+
+        assert transaction.timestamp.microsecond == 123456
+        assert transaction.timestamp == datetime.fromtimestamp(1_700_000_000).replace(microsecond=123456)
+
+    def test_withdraw_rejects_sub_cent_overdraft(self):
+        user_id = "user123"
+        with pytest.raises(ValueError, match="Insufficient balance"):
+            self.wallet_service.withdraw_funds(user_id, "USD", Decimal("0.004"))
+
+        self.wallet_service.fund_wallet(user_id, "USD", Decimal("100.00"))
+        with pytest.raises(ValueError, match="Insufficient balance"):
+            self.wallet_service.withdraw_funds(user_id, "USD", Decimal("100.004"))
+
+        assert self.wallet_service.get_balances(user_id) == {"USD": Decimal("100.00")}
+        assert len(self.wallet_service.get_transactions(user_id)) == 1
+
+    def test_convert_rejects_sub_cent_overdraft(self):
+        user_id = "user123"
+        self.wallet_service.fund_wallet(user_id, "USD", Decimal("10.00"))
+        with pytest.raises(ValueError, match="Insufficient balance"):
+            self.wallet_service.convert_currency(user_id, "USD", "MXN", Decimal("10.004"))
+
+        assert self.wallet_service.get_balances(user_id) == {"USD": Decimal("10.00")}
+
+    def test_minor_unit_arithmetic_rounds_half_up(self):
+        user_id = "user123"
+        self.wallet_service.fund_wallet(user_id, "USD", Decimal("10.005"))
+        result = self.wallet_service.convert_currency(user_id, "USD", "MXN", Decimal("0.05"))
+        assert result["converted_amount"] == Decimal("0.94")
+        assert result["from_balance"] == Decimal("9.96")
+
+        result = self.wallet_service.withdraw_funds(user_id, "USD", Decimal("9.96"))
+        assert result["new_balance"] == Decimal("0")
+        assert self.wallet_service.get_balances(user_id) == {"MXN": Decimal("0.94")}
+        assert self.wallet_service.reconcile_balances(user_id)["balanced"] is True
+
+    def test_convert_reports_exchange_rate_as_configured(self):
+        user_id = "user123"
+        self.wallet_service.fund_wallet(user_id, "USD", Decimal("10"))
+        result = self.wallet_service.convert_currency(user_id, "USD", "MXN", Decimal("1"))
+
+        assert str(result["exchange_rate"]) == "18.70"
+        assert str(self.wallet_service.get_transactions(user_id)[1].exchange_rate) == "18.70"
+
+        self.wallet_service.update_fx_rates({"USDMXN": Decimal("19.12345678")})
+        assert str(self.wallet_service.get_fx_rates()["USDMXN"]) == "19.12345678"
+        result = self.wallet_service.convert_currency(user_id, "USD", "MXN", Decimal("1"))
+        assert result["converted_amount"] == Decimal("19.12")
+
+    def test_update_fx_rates_rejects_rates_finer_than_supported(self):
+        self.wallet_service.update_fx_rates({"MXNUSD": Decimal("0.05347")})
+        assert self.wallet_service.get_fx_rates()["MXNUSD"] == Decimal("0.05347")
+
+        with pytest.raises(ValueError, match="at most 8 decimal places"):
+            self.wallet_service.update_fx_rates({"USDMXN": Decimal("18.5"), "MXNUSD": Decimal("0.053471234")})
+
+        rates = self.wallet_service.get_fx_rates()
+        assert str(rates["USDMXN"]) == "18.70"
+        assert rates["MXNUSD"] == Decimal("0.05347")
+
+    def test_many_distinct_currencies_stay_reconciled(self):
+        for index in range(200):
+            currency = chr(65 + index // 26 % 26) + chr(65 + index % 26) + "X"
+            self.wallet_service.fund_wallet("user123", currency, Decimal("1"))
+        self.wallet_service.fund_wallet("other", "ZZZ", Decimal("5"))
+
+        assert len(self.wallet_service.get_balances("user123")) == 200
+        assert self.wallet_service.reconcile_balances("user123")["balanced"] is True
+        assert self.wallet_service.reconcile_balances("other")["calculated_balances"] == {"ZZZ": Decimal("5")}
+
+    def test_fund_beyond_ledger_limit_leaves_state_unchanged(self):
+        user_id = "user123"
+        self.wallet_service.fund_wallet(user_id, "USD", Decimal("10"))
+        for amount in (Decimal("1e17"), Decimal("1e40")):
+            with pytest.raises(ValueError, match="maximum supported balance"):
+                self.wallet_service.fund_wallet(user_id, "USD", amount)
+        with pytest.raises(ValueError, match="Insufficient balance"):
+            self.wallet_service.withdraw_funds(user_id, "USD", Decimal("1e40"))
+
+        assert self.wallet_service.get_balances(user_id) == {"USD": Decimal("10")}
+        assert len(self.wallet_service.get_transactions(user_id)) == 1
+        assert self.wallet_service.reconcile_balances(user_id)["balanced"] is True
+
+    def test_reconcile_sums_large_balances_exactly(self):
+        user_id = "user123"
+        for amount in ("90071992547409.93", "0.01", "0.01"):
+            self.wallet_service.fund_wallet(user_id, "USD", Decimal(amount))
+
+        result = self.wallet_service.reconcile_balances(user_id)
+
+        assert result["calculated_balances"] == {"USD": Decimal("90071992547409.95")}
+        assert result["balanced"] is True
+
+    def test_transactions_record_the_rounded_amount_applied(self):
+        user_id = "user123"
+        self.wallet_service.fund_wallet(user_id, "USD", Decimal("20.004"))
+        result = self.wallet_service.convert_currency(user_id, "USD", "MXN", Decimal("10.555"))
+        self.wallet_service.withdraw_funds(user_id, "MXN", Decimal("0.005"))
+
+        fund, convert, withdraw = self.wallet_service.get_transactions(user_id)
+        assert str(fund.amount) == "20.00"
+        assert fund.description == "Funded 20.00 USD"
+        assert str(convert.amount) == "10.56"
+        assert convert.description == "Converted 10.56 USD to 197.47 MXN"
+        assert result["converted_amount"] == Decimal("197.47")
+        assert str(withdraw.amount) == "0.01"
+        assert withdraw.description == "Withdrew 0.01 MXN"
+        assert self.wallet_service.get_balances(user_id) == {"USD": Decimal("9.44"), "MXN": Decimal("197.46")}
@@ -1,93 +1,205 @@
-from decimal import Decimal, ROUND_HALF_UP
-from typing import Dict, List, Optional
+import asyncio
+import time
+from array import array
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+from types import MappingProxyType
 from datetime import datetime
 from dataclasses import dataclass, field
-from enum import Enum
+from enum import IntEnum
 
+import numpy as np
 
-class TransactionType(Enum):
-    FUND = "fund"
-    CONVERT = "convert"
-    WITHDRAW = "withdraw"
 
+class TransactionType(IntEnum):
+    FUND = 1
+    CONVERT = 2
+    WITHDRAW = 3
+    
+    @property
+    def label(self) -> str:
+        return _TRANSACTION_TYPE_LABELS[self]
+
+
+_TRANSACTION_TYPE_LABELS = {
+    TransactionType.FUND: "fund",
+    TransactionType.CONVERT: "convert",
+    TransactionType.WITHDRAW: "withdraw"
+}
 
-@dataclass
+
+@dataclass(slots=True, frozen=True)
 class Transaction:
     id: str
     user_id: str
     type: TransactionType
     currency: str
     amount: Decimal
-    timestamp: datetime
+    timestamp_ns: int
     description: str
     from_currency: Optional[str] = None
     to_currency: Optional[str] = None
     exchange_rate: Optional[Decimal] = None
+    
+    @property
+    def timestamp(self) -> datetime:
+        # Integer division keeps the microsecond exact; a float of ~1.7e9 s cannot
+        return datetime.fromtimestamp(self.timestamp_ns // 1_000_000_000).replace(
+            microsecond=self.timestamp_ns // 1000 % 1_000_000
+        )
+
+
+# Balances and ledger entries must fit the int64 reconciliation ledger
+MAX_BALANCE_MINOR = 2 ** 63 - 1
+
+RATE_DECIMALS = 8
+RATE_SCALE = 10 ** RATE_DECIMALS
 
 
 class WalletService:
     def __init__(self):
-        self.wallets: Dict[str, Dict[str, Decimal]] = {}
+        # Balances are held in integer minor units (cents/centavos)
+        self.wallets: Dict[str, Dict[str, int]] = {}
         self.transactions: Dict[str, List[Transaction]] = {}
-        self.fx_rates = {
-            ("USD", "MXN"): Decimal("18.70"),
-            ("MXN", "USD"): Decimal("0.053")
+        # Per-user ledger of (currency code, signed minor amount) entries for reconciliation
+        self._tx_currency_codes: Dict[str, array] = {}
+        self._tx_signed_minor: Dict[str, array] = {}
+        self._currency_codes: Dict[str, int] = {}
+        self._currencies: List[str] = []
+        self._balances_version: Dict[str, int] = {}
+        self._balances_snapshot: Dict[str, Tuple[int, Mapping[str, Decimal]]] = {}
+        self._recon_cache: Dict[str, Tuple[int, Dict[str, int]]] = {}
+        # Rates are held as integers scaled by RATE_SCALE
+        self.fx_rates: Dict[str, int] = {
+            "USDMXN": 1_870_000_000,
+            "MXNUSD": 5_300_000
+        }
+        # Rates exactly as configured, for display
+        self._fx_rate_decimals: Dict[str, Decimal] = {
+            "USDMXN": Decimal("18.70"),
+            "MXNUSD": Decimal("0.053")
         }
+        # Encoded GET /fx-rates body, rebuilt after the rates change
+        self.fx_rates_cached_body: Optional[bytes] = None
         self.transaction_counter = 0
+        self.lock = asyncio.Lock()
+        self._quant_cache: Dict[str, Decimal] = {
+            "USD": Decimal("0.01"),
+            "MXN": Decimal("0.01")
+        }
     
     def _get_precision(self, currency: str) -> int:
         return 2  # Standard for USD and MXN
     
     def _round_amount(self, amount: Decimal, currency: str) -> Decimal:
-        precision = self._get_precision(currency)
-        return amount.quantize(Decimal(10) ** -precision, rounding=ROUND_HALF_UP)
+        quant = self._quant_cache.get(currency)
+        if quant is None:
+            quant = Decimal(10) ** -self._get_precision(currency)
+            self._quant_cache[currency] = quant
+        return amount.quantize(quant, rounding=ROUND_HALF_UP)
+    
+    def _to_minor(self, amount: Decimal, currency: str) -> int:
+        try:
+            amount_minor = int(self._round_amount(amount, currency).scaleb(self._get_precision(currency)))
+        except InvalidOperation:
+            # quantize overflowed the decimal context, far beyond MAX_BALANCE_MINOR
+            amount_minor = MAX_BALANCE_MINOR + 1
+        self._check_balance_limit(abs(amount_minor))
+        return amount_minor
+    
+    def _check_balance_limit(self, amount_minor: int):
+        if amount_minor > MAX_BALANCE_MINOR:
+            raise ValueError("Amount exceeds the maximum supported balance")
+    
+    def _from_minor(self, amount: int, currency: str) -> Decimal:
+        return Decimal(amount).scaleb(-self._get_precision(currency))
+    
+    def _to_rate_scaled(self, rate: Decimal) -> int:
+        return int((rate * RATE_SCALE).to_integral_value(ROUND_HALF_UP))
+    
+    def _validate_rate(self, rate_key: str, rate: Decimal):
+        if not rate.is_finite() or rate.as_tuple().exponent < -RATE_DECIMALS:
+            raise ValueError(f"Exchange rate for {rate_key} must have at most {RATE_DECIMALS} decimal places")
+    
+    def _convert_minor(self, amount_minor: int, rate_scaled: int) -> int:
+        # ROUND_HALF_UP of amount * rate in integer arithmetic
+        return (amount_minor * rate_scaled + RATE_SCALE // 2) // RATE_SCALE
+    
+    def _currency_code(self, currency: str) -> int:
+        code = self._currency_codes.get(currency)
+        if code is None:
+            code = len(self._currencies)
+            self._currency_codes[currency] = code
+            self._currencies.append(currency)
+        return code
     
     def _ensure_wallet_exists(self, user_id: str):
         if user_id not in self.wallets:
             self.wallets[user_id] = {}
+            self._balances_version[user_id] = self._balances_version.get(user_id, 0) + 1
         if user_id not in self.transactions:
             self.transactions[user_id] = []
+            self._tx_currency_codes[user_id] = array("i")
+            self._tx_signed_minor[user_id] = array("q")
+            self._recon_cache.pop(user_id, None)
     
     def _get_balance(self, user_id: str, currency: str) -> Decimal:
         self._ensure_wallet_exists(user_id)
-        return self.wallets[user_id].get(currency, Decimal("0"))
+        return self._from_minor(self.wallets[user_id].get(currency, 0), currency)
     
     def _set_balance(self, user_id: str, currency: str, amount: Decimal):
         self._ensure_wallet_exists(user_id)
-        rounded_amount = self._round_amount(amount, currency)
-        if rounded_amount == Decimal("0"):
-            self.wallets[user_id].pop(currency, None)
+        self._write_balance(user_id, self.wallets[user_id], currency, self._to_minor(amount, currency))
+    
+    def _write_balance(self, user_id: str, wallet: Dict[str, int], currency: str, amount_minor: int):
+        # Hot-path variant of _set_balance for callers that already ensured the wallet
+        if amount_minor == 0:
+            wallet.pop(currency, None)
         else:
-            self.wallets[user_id][currency] = rounded_amount
+            wallet[currency] = amount_minor
+        self._balances_version[user_id] += 1
     
-    def _add_transaction(self, user_id: str, transaction: Transaction):
-        self._ensure_wallet_exists(user_id)
+    def _record_transaction(self, user_id: str, transaction: Transaction, entries: Sequence[Tuple[int, int]]):
+        # entries are (currency code, signed minor amount) pairs, computed before any state changes
         self.transactions[user_id].append(transaction)
+        codes = self._tx_currency_codes[user_id]
+        signed_minor = self._tx_signed_minor[user_id]
+        for code, amount_minor in entries:
+            codes.append(code)
+            signed_minor.append(amount_minor)
     
     def _generate_transaction_id(self) -> str:
         self.transaction_counter += 1
-        return f"tx_{self.transaction_counter:06d}"
+        return "tx_" + str(self.transaction_counter).zfill(6)
     
     def fund_wallet(self, user_id: str, currency: str, amount: Decimal) -> Dict:
         if amount <= 0:
             raise ValueError("Amount must be positive")
         
-        current_balance = self._get_balance(user_id, currency)
-        new_balance = current_balance + amount
-        self._set_balance(user_id, currency, new_balance)
+        self._ensure_wallet_exists(user_id)
+        wallet = self.wallets[user_id]
+        
+        amount_minor = self._to_minor(amount, currency)
+        # Record the amount actually applied, i.e. rounded to the currency's precision
+        applied_amount = self._from_minor(amount_minor, currency)
+        new_balance_minor = wallet.get(currency, 0) + amount_minor
+        self._check_balance_limit(new_balance_minor)
+        entries = ((self._currency_code(currency), amount_minor),)
+        
+        self._write_balance(user_id, wallet, currency, new_balance_minor)
         
         transaction = Transaction(
             id=self._generate_transaction_id(),
             user_id=user_id,
             type=TransactionType.FUND,
             currency=currency,
-            amount=amount,
-            timestamp=datetime.now(),
-            description=f"Funded {amount} {currency}"
+            amount=applied_amount,
+            timestamp_ns=time.time_ns(),
+            description=f"Funded {applied_amount} {currency}"
         )
-        self._add_transaction(user_id, transaction)
+        self._record_transaction(user_id, transaction, entries)
         
-        return {"success": True, "new_balance": new_balance}
+        return {"success": True, "new_balance": self._from_minor(new_balance_minor, currency)}
     
     def convert_currency(self, user_id: str, from_currency: str, to_currency: str, amount: Decimal) -> Dict:
         if amount <= 0:
@@ -96,113 +208,161 @@ class WalletService:
         if from_currency == to_currency:
             raise ValueError("Cannot convert to same currency")
 
-        rate_key = (from_currency, to_currency)
-        if rate_key not in self.fx_rates:
+        rate_scaled = self.fx_rates.get(from_currency + to_currency)
+        if rate_scaled is None:
             raise ValueError(f"Exchange rate not available for {from_currency} to {to_currency}")
         
-        exchange_rate = self.fx_rates[rate_key]
+        self._ensure_wallet_exists(user_id)
+        wallet = self.wallets[user_id]
         
-        current_balance = self._get_balance(user_id, from_currency)
+        current_balance_minor = wallet.get(from_currency, 0)
+        # Compare against the unrounded amount so sub-cent overdrafts are still rejected
+        current_balance = self._from_minor(current_balance_minor, from_currency)
         if current_balance < amount:
             raise ValueError(f"Insufficient balance. Available: {current_balance} {from_currency}")
+        amount_minor = self._to_minor(amount, from_currency)
+        applied_amount = self._from_minor(amount_minor, from_currency)
         
-        converted_amount = self._round_amount(amount * exchange_rate, to_currency)
-        
-        new_from_balance = current_balance - amount
-        self._set_balance(user_id, from_currency, new_from_balance)
+        converted_minor = self._convert_minor(amount_minor, rate_scaled)
+        converted_amount = self._from_minor(converted_minor, to_currency)
+        exchange_rate = self._fx_rate_decimals[from_currency + to_currency]
+        new_from_balance_minor = current_balance_minor - amount_minor
+        new_to_balance_minor = wallet.get(to_currency, 0) + converted_minor
+        self._check_balance_limit(new_to_balance_minor)
+        entries = (
+            (self._currency_code(from_currency), -amount_minor),
+            (self._currency_code(to_currency), converted_minor)
+        )
         
-        current_to_balance = self._get_balance(user_id, to_currency)
-        new_to_balance = current_to_balance + converted_amount
-        self._set_balance(user_id, to_currency, new_to_balance)
+        self._write_balance(user_id, wallet, from_currency, new_from_balance_minor)
+        self._write_balance(user_id, wallet, to_currency, new_to_balance_minor)
         
         transaction = Transaction(
             id=self._generate_transaction_id(),
             user_id=user_id,
             type=TransactionType.CONVERT,
             currency=from_currency,
-            amount=amount,
-            timestamp=datetime.now(),
-            description=f"Converted {amount} {from_currency} to {converted_amount} {to_currency}",
+            amount=applied_amount,
+            timestamp_ns=time.time_ns(),
+            description=f"Converted {applied_amount} {from_currency} to {converted_amount} {to_currency}",
             from_currency=from_currency,
             to_currency=to_currency,
             exchange_rate=exchange_rate
         )
-        self._add_transaction(user_id, transaction)
+        self._record_transaction(user_id, transaction, entries)
         
         return {
             "success": True,
             "converted_amount": converted_amount,
             "exchange_rate": exchange_rate,
-            "from_balance": new_from_balance,
-            "to_balance": new_to_balance
+            "from_balance": self._from_minor(new_from_balance_minor, from_currency),
+            "to_balance": self._from_minor(new_to_balance_minor, to_currency)
         }
     
     def withdraw_funds(self, user_id: str, currency: str, amount: Decimal) -> Dict:
         if amount <= 0:
             raise ValueError("Amount must be positive")
         
-        current_balance = self._get_balance(user_id, currency)
+        self._ensure_wallet_exists(user_id)
+        wallet = self.wallets[user_id]
+        
+        current_balance_minor = wallet.get(currency, 0)
+        # Compare against the unrounded amount so sub-cent overdrafts are still rejected
+        current_balance = self._from_minor(current_balance_minor, currency)
         if current_balance < amount:
             raise ValueError(f"Insufficient balance. Available: {current_balance} {currency}")
+        amount_minor = self._to_minor(amount, currency)
+        applied_amount = self._from_minor(amount_minor, currency)
+        
+        new_balance_minor = current_balance_minor - amount_minor
+        entries = ((self._currency_code(currency), -amount_minor),)
         
-        new_balance = current_balance - amount
-        self._set_balance(user_id, currency, new_balance)
+        self._write_balance(user_id, wallet, currency, new_balance_minor)
         
         transaction = Transaction(
             id=self._generate_transaction_id(),
             user_id=user_id,
             type=TransactionType.WITHDRAW,
             currency=currency,
-            amount=amount,
-            timestamp=datetime.now(),
-            description=f"Withdrew {amount} {currency}"
+            amount=applied_amount,
+            timestamp_ns=time.time_ns(),
+            description=f"Withdrew {applied_amount} {currency}"
         )
-        self._add_transaction(user_id, transaction)
+        self._record_transaction(user_id, transaction, entries)
         
-        return {"success": True, "new_balance": new_balance}
+        return {"success": True, "new_balance": self._from_minor(new_balance_minor, currency)}
     
-    def get_balances(self, user_id: str) -> Dict[str, Decimal]:
+    def get_balances(self, user_id: str) -> Mapping[str, Decimal]:
         self._ensure_wallet_exists(user_id)
-        return dict(self.wallets[user_id])
+        version = self._balances_version[user_id]
+        snapshot = self._balances_snapshot.get(user_id)
+        if snapshot is not None and snapshot[0] == version:
+            return snapshot[1]
+        
+        balances = MappingProxyType({
+            currency: self._from_minor(amount, currency)
+            for currency, amount in self.wallets[user_id].items()
+        })
+        self._balances_snapshot[user_id] = (version, balances)
+        return balances
     
     def get_transactions(self, user_id: str) -> List[Transaction]:
         self._ensure_wallet_exists(user_id)
         return self.transactions[user_id].copy()
     
+    def get_transactions_view(self, user_id: str) -> Sequence[Transaction]:
+        # Live list, not a copy: callers must only read it
+        self._ensure_wallet_exists(user_id)
+        return self.transactions[user_id]
+    
     def reconcile_balances(self, user_id: str) -> Dict:
-        transactions = self.get_transactions(user_id)
-        calculated_balances = {}
-        
-        for transaction in transactions:
-            if transaction.type == TransactionType.FUND:
-                currency = transaction.currency
-                calculated_balances[currency] = calculated_balances.get(currency, Decimal("0")) + transaction.amount
-            
-            elif transaction.type == TransactionType.WITHDRAW:
-                currency = transaction.currency
-                calculated_balances[currency] = calculated_balances.get(currency, Decimal("0")) - transaction.amount
-            
-            elif transaction.type == TransactionType.CONVERT:
-                from_currency = transaction.from_currency
-                to_currency = transaction.to_currency
-                
-                calculated_balances[from_currency] = calculated_balances.get(from_currency, Decimal("0")) - transaction.amount
-                
-                converted_amount = self._round_amount(transaction.amount * transaction.exchange_rate, to_currency)
-                calculated_balances[to_currency] = calculated_balances.get(to_currency, Decimal("0")) + converted_amount
-        
-        for currency in calculated_balances:
-            calculated_balances[currency] = self._round_amount(calculated_balances[currency], currency)
-        
-        calculated_balances = {k: v for k, v in calculated_balances.items() if v > 0}
+        self._ensure_wallet_exists(user_id)
+        codes = self._tx_currency_codes[user_id]
+        signed_minor = self._tx_signed_minor[user_id]
+        count = len(codes)
+        
+        # Ledger entries are append-only, so only the suffix since the last call is folded
+        last_idx, cached_totals = self._recon_cache.get(user_id, (0, {}))
+        totals_minor = cached_totals
+        if count > last_idx:
+            new_codes = np.frombuffer(codes, dtype=np.intc)[last_idx:]
+            # Sized to this user's highest code, not the global currency table
+            totals = np.zeros(int(new_codes.max()) + 1, dtype=np.int64)
+            # np.add.at sums in int64; bincount's float64 weights lose cents above 2**53
+            np.add.at(totals, new_codes, np.frombuffer(signed_minor, dtype=np.int64)[last_idx:])
+            totals_minor = dict(cached_totals)
+            for code in np.flatnonzero(totals).tolist():
+                currency = self._currencies[code]
+                # Zero balances are dropped as they fold, mirroring _write_balance
+                balance = totals_minor.get(currency, 0) + int(totals[code])
+                if balance == 0:
+                    totals_minor.pop(currency, None)
+                else:
+                    totals_minor[currency] = balance
+            self._recon_cache[user_id] = (count, totals_minor)
+        
+        calculated_balances = {
+            currency: self._from_minor(total, currency)
+            for currency, total in totals_minor.items()
+        }
         
         current_balances = self.get_balances(user_id)
         
         return {
-            "current_balances": current_balances,
+            "current_balances": dict(current_balances),
             "calculated_balances": calculated_balances,
             "balanced": current_balances == calculated_balances
         }
     
-    def update_fx_rates(self, new_rates: Dict[tuple, Decimal]):
-        self.fx_rates.update(new_rates)
\ No newline at end of file
+    def get_fx_rates(self) -> Dict[str, Decimal]:
+        return dict(self._fx_rate_decimals)
+    
+    def update_fx_rates(self, new_rates: Dict[str, Decimal]):
+        # Validate every rate first so a rejected update changes nothing
+        for rate_key, rate in new_rates.items():
+            self._validate_rate(rate_key, rate)
+        
+        self.fx_rates_cached_body = None
+        for rate_key, rate in new_rates.items():
+            self._fx_rate_decimals[rate_key] = rate
+            self.fx_rates[rate_key] = self._to_rate_scaled(rate)
\ No newline at end of file